@@ -5,34 +5,82 @@ Uses only the Python standard library, reads TELEGRAM_BOT_TOKEN from .env or env
 and long polling to avoid external dependencies.
 """
 
+import atexit
+import collections
+import functools
+import io
 import json
 import logging
+import logging.handlers
 import os
+import queue
 import re
+import select
+import signal
 import socket
 import ssl
 import sys
+import threading
 import time
 import urllib.error
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from http import client as http_client
 
+try:  # orjson быстрее разбирает ответы API, но бот работает и без него.
+    from orjson import loads as _json_loads
+except ImportError:  # pragma: no cover - optional dependency
+    _json_loads = json.loads
+
 
 WELCOME_TEXT = "Надішліть номер телефона чи емейл для ідентифікації клієнта."
+WELCOME_TEXT_PHONE_ONLY = "Надішліть номер телефона для ідентифікації клієнта."
 
+TELEGRAM_HOST = "api.telegram.org"
 KEYCRM_API_URL = "https://openapi.keycrm.app/v1/buyer"
-
-
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+_KEYCRM_URL = urllib.parse.urlsplit(KEYCRM_API_URL)
+
+_ALLOWED_UPDATES = urllib.parse.quote_plus('["message"]').encode("ascii")
+_NON_DIGIT = re.compile(r"\D")
+_ASCII_NON_DIGITS = dict.fromkeys(code for code in range(128) if not chr(code).isdigit())
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+# Потоки-обработчики только кладут записи в очередь, в stderr пишет отдельный поток
+# QueueListener, чтобы логирование не блокировало воркеры на I/O.
+_LOG_QUEUE: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_LOG_LISTENER = logging.handlers.QueueListener(_LOG_QUEUE, logging.StreamHandler())
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s",
+    handlers=[logging.handlers.QueueHandler(_LOG_QUEUE)],
+)
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
 logger = logging.getLogger("crm_bot")
 
 # Значения по умолчанию, будут обновлены после загрузки .env.
 TELEGRAM_TIMEOUT = 8.0
 KEYCRM_TIMEOUT = 8.0
 TELEGRAM_POLL_TIMEOUT = 20
-_TELEGRAM_OPENER: urllib.request.OpenerDirector | None = None
-_TELEGRAM_USE_OPENER = False
+TELEGRAM_UPDATES_LIMIT = 100
+HANDLER_WORKERS = 8
+UPDATE_QUEUE_SIZE = 1000
+# Набор функций бота, переключается переменными окружения ENABLE_*.
+ENABLE_EMAIL_LOOKUP = True
+ENABLE_CRM = True
+INPUT_HINT_TEXT = ""
+# Неизменная часть тела sendMessage для приветствия (всё, кроме chat_id).
+_WELCOME_BODY_SUFFIX = b""
+EMPTY_POLL_DELAY_STEP = 0.05
+EMPTY_POLL_MAX_DELAY = 5.0
+ERROR_MAX_DELAY = 30
+SHUTDOWN_TIMEOUT = 10.0
+_SSL_CONTEXT: ssl.SSLContext | None = None
+_TELEGRAM_CLIENT: "_KeepAliveClient | None" = None
+_TELEGRAM_POLL_CLIENT: "_KeepAliveClient | None" = None
+_KEYCRM_CLIENT: "_KeepAliveClient | None" = None
+_SEND_LIMITER: "_RateLimiter | None" = None
 
 class IPv4HTTPSConnection(http_client.HTTPSConnection):
     """HTTPSConnection, который резолвит только IPv4."""
@@ -65,9 +113,191 @@ class IPv4HTTPSConnection(http_client.HTTPSConnection):
         raise OSError("getaddrinfo returned empty for IPv4")
 
 
-class IPv4HTTPSHandler(urllib.request.HTTPSHandler):
-    def https_open(self, req):
-        return self.do_open(IPv4HTTPSConnection, req)
+class _KeepAliveClient:
+    """Persistent HTTPS connection to a single host, one socket per thread.
+
+    Reuses TCP+TLS between calls instead of reconnecting on every request.
+    Errors are raised as urllib.error.URLError/HTTPError, like urlopen does.
+    """
+
+    # Ошибки, при которых сервер, скорее всего, закрыл простаивающее соединение.
+    _STALE_ERRORS = (http_client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+    # Запрос мог дойти до сервера до обрыва, поэтому повторяем только идемпотентные методы
+    # (повтор sendMessage отправил бы пользователю дубликат).
+    _IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+    def __init__(
+        self,
+        host: str,
+        timeout: float,
+        context: ssl.SSLContext,
+        connection_class: type[http_client.HTTPSConnection] = http_client.HTTPSConnection,
+    ) -> None:
+        self.host = host
+        self.timeout = timeout
+        self.context = context
+        self.connection_class = connection_class
+        self._local = threading.local()
+
+    @staticmethod
+    def _is_dropped(conn: http_client.HTTPSConnection) -> bool:
+        """Check whether the server has closed an idle connection."""
+        sock = conn.sock
+        if sock is None:
+            return False
+        try:
+            if not select.select([sock], [], [], 0)[0]:
+                return False
+            # Сокет может быть «читаемым» из-за служебных TLS-записей (session ticket),
+            # поэтому пробуем прочитать без блокировки: b"" или данные значат, что
+            # соединение закрыто или испорчено.
+            sock.settimeout(0)
+            try:
+                sock.recv(1)
+                return True
+            except (ssl.SSLWantReadError, BlockingIOError):
+                return False
+            finally:
+                sock.settimeout(conn.timeout)
+        except (OSError, ValueError):
+            return True
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> bytes:
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is not None and self._is_dropped(conn):
+                # Проверяем простаивающее соединение до отправки, как urllib3.
+                self.close()
+                conn = None
+            reused = conn is not None
+            if conn is None:
+                conn = self.connection_class(self.host, timeout=self.timeout, context=self.context)
+                self._local.conn = conn
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                payload = response.read()
+            except self._STALE_ERRORS as exc:
+                self.close()
+                # Повторяем один раз, только если упало переиспользованное соединение.
+                if reused and attempt == 0 and method in self._IDEMPOTENT_METHODS:
+                    continue
+                raise urllib.error.URLError(exc) from exc
+            except (OSError, http_client.HTTPException) as exc:
+                self.close()
+                raise urllib.error.URLError(exc) from exc
+
+            if response.will_close:
+                self.close()
+            if response.status >= 400:
+                raise urllib.error.HTTPError(
+                    f"https://{self.host}{path}",
+                    response.status,
+                    response.reason,
+                    response.headers,
+                    io.BytesIO(payload),
+                )
+            return payload
+        raise AssertionError("unreachable")  # pragma: no cover
+
+
+class _RateLimiter:
+    """Token bucket (rate per second, burst) shared by all sendMessage calls.
+
+    Callers reserve a token under the lock and sleep outside it, so they are
+    released in arrival order at no more than `rate` messages per second.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+
+
+class _ChatScheduler:
+    """Hands queued updates to handler threads chat by chat, round-robin.
+
+    A chat is given to at most one thread at a time, so its updates are handled in
+    order; after each update the chat goes to the back of the line. A chat with a
+    long backlog therefore occupies a single thread and cannot hold back other chats.
+    After close() threads drain what is queued and then get None.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._cond = threading.Condition()
+        self._pending: dict[int, collections.deque[dict]] = {}
+        self._ready: collections.deque[int] = collections.deque()
+        self._size = 0
+        self._closed = False
+
+    def put(self, chat_id: int, update: dict) -> None:
+        with self._cond:
+            while self._size >= self.capacity:
+                self._cond.wait()
+            updates = self._pending.get(chat_id)
+            if updates is None:
+                # Чат не ждёт и не обрабатывается: ставим его в очередь.
+                # Иначе он вернётся в очередь сам после done().
+                updates = self._pending[chat_id] = collections.deque()
+                self._ready.append(chat_id)
+            updates.append(update)
+            self._size += 1
+            self._cond.notify_all()
+
+    def get(self) -> tuple[int, dict] | None:
+        with self._cond:
+            while not self._ready:
+                if self._closed and not self._pending:
+                    return None
+                self._cond.wait()
+            chat_id = self._ready.popleft()
+            update = self._pending[chat_id].popleft()
+            self._size -= 1
+            self._cond.notify_all()
+            return chat_id, update
+
+    def done(self, chat_id: int) -> None:
+        with self._cond:
+            if self._pending[chat_id]:
+                self._ready.append(chat_id)
+            else:
+                del self._pending[chat_id]
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def unfinished(self) -> int:
+        """Number of updates still queued or being handled."""
+        with self._cond:
+            return self._size + len(self._pending) - len(self._ready)
 
 
 def load_dotenv(path: str = ".env") -> None:
@@ -99,26 +329,68 @@ def _ssl_context() -> ssl.SSLContext:
     return ssl.create_default_context()
 
 
+def _env_flag(name: str, default: bool = True) -> bool:
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _input_hint_text() -> str:
+    if ENABLE_EMAIL_LOOKUP:
+        return "Будь ласка, введіть номер у форматі +380XXXXXXXXX, e-mail або поділіться контактом кнопкою."
+    return "Будь ласка, введіть номер у форматі +380XXXXXXXXX."
+
+
 def _apply_env_settings() -> None:
-    """Load .env and apply runtime settings (timeouts, IPv4 forcing)."""
-    global TELEGRAM_TIMEOUT, KEYCRM_TIMEOUT, TELEGRAM_POLL_TIMEOUT, _TELEGRAM_OPENER, _TELEGRAM_USE_OPENER  # type: ignore
+    """Load .env and apply runtime settings (timeouts, IPv4 forcing, feature flags)."""
+    global TELEGRAM_TIMEOUT, KEYCRM_TIMEOUT, TELEGRAM_POLL_TIMEOUT, HANDLER_WORKERS, _SSL_CONTEXT  # type: ignore
+    global TELEGRAM_UPDATES_LIMIT  # type: ignore
+    global ENABLE_EMAIL_LOOKUP, ENABLE_CRM, INPUT_HINT_TEXT  # type: ignore
+    global _WELCOME_BODY_SUFFIX  # type: ignore
+    global _TELEGRAM_CLIENT, _TELEGRAM_POLL_CLIENT, _KEYCRM_CLIENT, _SEND_LIMITER  # type: ignore
+    global _CRM_EXECUTOR  # type: ignore
 
     load_dotenv()
     TELEGRAM_TIMEOUT = float(os.environ.get("TELEGRAM_TIMEOUT_SECONDS", "8"))
     KEYCRM_TIMEOUT = float(os.environ.get("KEYCRM_TIMEOUT_SECONDS", "8"))
     TELEGRAM_POLL_TIMEOUT = int(os.environ.get("TELEGRAM_POLL_TIMEOUT_SECONDS", "20"))
+    TELEGRAM_UPDATES_LIMIT = min(max(int(os.environ.get("TELEGRAM_UPDATES_LIMIT", "100")), 1), 100)
+    HANDLER_WORKERS = max(int(os.environ.get("BOT_HANDLER_WORKERS", "8")), 1)
+    _CRM_EXECUTOR = ThreadPoolExecutor(max_workers=HANDLER_WORKERS, thread_name_prefix="keycrm")
     # Не даём poll висеть дольше сетевого таймаута.
     if TELEGRAM_POLL_TIMEOUT >= TELEGRAM_TIMEOUT:
         TELEGRAM_POLL_TIMEOUT = max(int(TELEGRAM_TIMEOUT) - 1, 1)
 
+    ENABLE_EMAIL_LOOKUP = _env_flag("ENABLE_EMAIL_LOOKUP")
+    ENABLE_CRM = _env_flag("ENABLE_CRM")
+    INPUT_HINT_TEXT = _input_hint_text()
+
+    welcome_text = WELCOME_TEXT if ENABLE_EMAIL_LOOKUP else WELCOME_TEXT_PHONE_ONLY
+    _WELCOME_BODY_SUFFIX = urllib.parse.urlencode({"text": welcome_text}).encode("utf-8")
+
+    # TLS-контекст собираем один раз и отдаём всем клиентам.
+    _SSL_CONTEXT = _ssl_context()
+
+    telegram_connection: type[http_client.HTTPSConnection] = http_client.HTTPSConnection
     if os.environ.get("TELEGRAM_FORCE_IPV4") == "1":
-        # Используем собственный opener с IPv4 HTTPS handler и контекстом TLS по текущим настройкам.
-        _TELEGRAM_OPENER = urllib.request.build_opener(IPv4HTTPSHandler(context=_ssl_context()))
-        _TELEGRAM_USE_OPENER = True
-        logger.info("Using IPv4-only opener for Telegram calls")
-    else:
-        _TELEGRAM_OPENER = None
-        _TELEGRAM_USE_OPENER = False
+        telegram_connection = IPv4HTTPSConnection
+        logger.info("Using IPv4-only connections for Telegram calls")
+
+    # getUpdates держим на отдельном соединении, чтобы long polling не мешал sendMessage.
+    _TELEGRAM_CLIENT = _KeepAliveClient(
+        TELEGRAM_HOST, TELEGRAM_TIMEOUT, _SSL_CONTEXT, telegram_connection
+    )
+    _TELEGRAM_POLL_CLIENT = _KeepAliveClient(
+        TELEGRAM_HOST, TELEGRAM_TIMEOUT, _SSL_CONTEXT, telegram_connection
+    )
+    _KEYCRM_CLIENT = _KeepAliveClient(_KEYCRM_URL.netloc, KEYCRM_TIMEOUT, _SSL_CONTEXT)
+
+    # Telegram ограничивает бота ~30 сообщениями в секунду; держимся чуть ниже.
+    _SEND_LIMITER = _RateLimiter(
+        max(float(os.environ.get("TELEGRAM_SEND_RATE", "25")), 1.0),
+        max(int(os.environ.get("TELEGRAM_SEND_BURST", "30")), 1),
+    )
 
 
 # Инициализация настроек при импорте.
@@ -133,7 +405,7 @@ def _get_token() -> str:
     return token
 
 
-def _allowed_chat_ids() -> set[int]:
+def _allowed_chat_ids() -> frozenset[int]:
     raw = os.environ.get("ALLOWED_CHAT_IDS", "")
     ids: set[int] = set()
     for part in raw.split(","):
@@ -144,75 +416,72 @@ def _allowed_chat_ids() -> set[int]:
             ids.add(int(part))
         except ValueError:
             continue
-    return ids
+    return frozenset(ids)
 
 
+@functools.lru_cache(maxsize=1)
 def _get_keycrm_token() -> str | None:
     # Токен KeyCRM (KEYCRM_TOKEN) потрібен, щоб перевірити, чи є номер у CRM.
     return os.environ.get("KEYCRM_TOKEN")
 
 
-def _api_url(token: str, method: str) -> str:
-    return f"https://api.telegram.org/bot{token}/{method}"
+@functools.lru_cache(maxsize=8)
+def _api_path(token: str, method: str) -> str:
+    # Набор методов фиксирован (getUpdates, sendMessage, deleteWebhook), путь строим один раз.
+    return f"/bot{token}/{method}"
 
 
-def _call_api(token: str, method: str, params: dict | None = None) -> dict:
+def _call_api(token: str, method: str, params: dict | bytes | None = None) -> dict:
+    """Call a Telegram Bot API method; params may be a dict or a ready urlencoded body."""
     logger.info("Telegram call: %s", method)
     data = None
+    headers = {}
     if params:
-        data = urllib.parse.urlencode(params).encode("utf-8")
-    request = urllib.request.Request(_api_url(token, method), data=data, method="POST")
+        data = params if isinstance(params, bytes) else urllib.parse.urlencode(params).encode("utf-8")
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    client = _TELEGRAM_POLL_CLIENT if method == "getUpdates" else _TELEGRAM_CLIENT
+    assert client is not None
     started_at = time.perf_counter()
     try:
-        if _TELEGRAM_USE_OPENER and _TELEGRAM_OPENER:
-            response_obj = _TELEGRAM_OPENER.open(  # type: ignore[attr-defined]
-                request, timeout=TELEGRAM_TIMEOUT
-            )
-        else:
-            response_obj = urllib.request.urlopen(
-                request, timeout=TELEGRAM_TIMEOUT, context=_ssl_context()
-            )
-
-        with response_obj as response:
-            parsed = json.load(response)
-            duration = time.perf_counter() - started_at
-            logger.info("Telegram response: ok=%s in %.3fs", parsed.get("ok"), duration)
-            return parsed
+        body = client.request("POST", _api_path(token, method), data, headers)
+        parsed = _json_loads(body)
+        duration = time.perf_counter() - started_at
+        logger.info("Telegram response: ok=%s in %.3fs", parsed.get("ok"), duration)
+        return parsed
+    except urllib.error.URLError as exc:
+        # Сетевые сбои ожидаемы и обрабатываются выше, traceback здесь не нужен.
+        duration = time.perf_counter() - started_at
+        logger.info("Telegram request failed for %s in %.3fs: %s", method, duration, exc)
+        raise
     except Exception as exc:
         duration = time.perf_counter() - started_at
         logger.exception("Telegram request failed for %s in %.3fs: %s", method, duration, exc)
         raise
 
 
-def _ssl_context() -> ssl.SSLContext:
-    ca_bundle = os.environ.get("TELEGRAM_CA_BUNDLE")
-    if ca_bundle:
-        return ssl.create_default_context(cafile=ca_bundle)
-
-    if os.environ.get("TELEGRAM_SKIP_TLS_VERIFY") == "1":
-        # В корпоративных сетях с перехватом TLS сертификат может быть самоподписанным.
-        # Отключение проверки уменьшает безопасность, используйте только если доверяете сети.
-        return ssl._create_unverified_context()
-
-    return ssl.create_default_context()
-
-
 def get_updates(token: str, offset: int) -> list[dict]:
-    payload = {"offset": offset, "timeout": TELEGRAM_POLL_TIMEOUT}
+    # Бот обрабатывает только message: остальные типы апдейтов Telegram не присылает,
+    # а limit ограничивает размер одной пачки (и пиковую память на её разбор).
+    payload = b"offset=%d&timeout=%d&limit=%d&allowed_updates=%s" % (
+        offset,
+        TELEGRAM_POLL_TIMEOUT,
+        TELEGRAM_UPDATES_LIMIT,
+        _ALLOWED_UPDATES,
+    )
     response = _call_api(token, "getUpdates", payload)
     return response.get("result", [])
 
 
 def send_message(token: str, chat_id: int, text: str) -> None:
+    assert _SEND_LIMITER is not None
+    _SEND_LIMITER.acquire()
     _call_api(token, "sendMessage", {"chat_id": chat_id, "text": text})
 
 
 def send_welcome(token: str, chat_id: int) -> None:
-    payload = {
-        "chat_id": chat_id,
-        "text": WELCOME_TEXT,
-    }
-    _call_api(token, "sendMessage", payload)
+    assert _SEND_LIMITER is not None
+    _SEND_LIMITER.acquire()
+    _call_api(token, "sendMessage", b"chat_id=%d&%s" % (chat_id, _WELCOME_BODY_SUFFIX))
 
 
 def clear_webhook(token: str) -> None:
@@ -223,6 +492,14 @@ def clear_webhook(token: str) -> None:
         logger.warning("Unable to delete webhook automatically: %s", exc)
 
 
+def _keycrm_headers(keycrm_token: str) -> dict[str, str]:
+    return {
+        "Content-type": "application/json",
+        "Accept": "application/json",
+        "Authorization": f"Bearer {keycrm_token}",
+    }
+
+
 def _fetch_keycrm(filter_field: str, value: str) -> dict | None:
     keycrm_token = _get_keycrm_token()
     if not keycrm_token:
@@ -236,26 +513,23 @@ def _fetch_keycrm(filter_field: str, value: str) -> dict | None:
             f"filter[{filter_field}]": value,
         }
     )
-    url = f"{KEYCRM_API_URL}?{params}"
-    request = urllib.request.Request(url, method="GET")
-    request.add_header("Content-type", "application/json")
-    request.add_header("Accept", "application/json")
-    request.add_header("Authorization", f"Bearer {keycrm_token}")
+    path = f"{_KEYCRM_URL.path}?{params}"
+    headers = _keycrm_headers(keycrm_token)
 
     logger.info("KeyCRM request: filter[%s]=%s", filter_field, value)
     started_at = time.perf_counter()
 
     try:
-        with urllib.request.urlopen(request, timeout=KEYCRM_TIMEOUT, context=_ssl_context()) as resp:
-            parsed = json.load(resp)
-            duration = time.perf_counter() - started_at
-            logger.info(
-                "KeyCRM response: total=%s count=%s in %.3fs",
-                parsed.get("total"),
-                len(parsed.get("data") or []),
-                duration,
-            )
-            return parsed
+        assert _KEYCRM_CLIENT is not None
+        parsed = _json_loads(_KEYCRM_CLIENT.request("GET", path, headers=headers))
+        duration = time.perf_counter() - started_at
+        logger.info(
+            "KeyCRM response: total=%s count=%s in %.3fs",
+            parsed.get("total"),
+            len(parsed.get("data") or []),
+            duration,
+        )
+        return parsed
     except Exception as exc:  # pragma: no cover - CRM checks are best-effort
         duration = time.perf_counter() - started_at
         logger.warning("CRM lookup failed for value=%s in %.3fs: %s", value, duration, exc)
@@ -271,19 +545,14 @@ def _lookup_buyers(filter_field: str, value: str) -> tuple[list[dict], int]:
     return buyers, total
 
 
-def _format_crm_message(buyers: list[dict], total: int) -> str:
-    if not buyers:
-        if _get_keycrm_token():
-            return "Номер не знайдено в системі."
-        return "Перевірка номера в CRM недоступна зараз."
+def _join_values(values: list[str] | None) -> str:
+    return ", ".join(filter(None, values or ()))
 
-    def _join(values: list[str] | None) -> str:
-        return ", ".join([v for v in values or [] if v])
 
-    def _format_shipping(shipping: list[dict] | None) -> list[str]:
-        lines: list[str] = []
-        for item in (shipping or [])[:3]:
-            parts = [
+def _append_shipping(lines: list[str], shipping: list[dict] | None) -> None:
+    for item in (shipping or [])[:3]:
+        packed = _join_values(
+            [
                 item.get("address"),
                 item.get("additional_address"),
                 item.get("city"),
@@ -291,24 +560,38 @@ def _format_crm_message(buyers: list[dict], total: int) -> str:
                 item.get("zip_code"),
                 item.get("country"),
             ]
-            packed = ", ".join([p for p in parts if p])
-            if packed:
-                lines.append(f"Адреса: {packed}")
-        return lines
-
-    def _format_custom_fields(custom_fields: list[dict] | None) -> list[str]:
-        lines: list[str] = []
-        for cf in custom_fields or []:
-            uuid = cf.get("uuid") or "поле"
-            value = cf.get("value")
-            if value:
-                if isinstance(value, list):
-                    value = ", ".join(map(str, value))
-                lines.append(f"{uuid}: {value}")
-        return lines[:5]
+        )
+        if packed:
+            lines.append(f"   Адреса: {packed}")
+
+
+def _append_custom_fields(lines: list[str], custom_fields: list[dict] | None) -> None:
+    header_at = len(lines)
+    count = 0
+    for cf in custom_fields or []:
+        value = cf.get("value")
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = ", ".join(map(str, value))
+        lines.append(f"   - {cf.get('uuid') or 'поле'}: {value}")
+        count += 1
+        if count == 5:
+            break
+    if count:
+        lines.insert(header_at, "   Кастомні поля:")
+
+
+def _format_crm_message(buyers: list[dict], total: int) -> str:
+    if not buyers:
+        if _get_keycrm_token():
+            return "Номер не знайдено в системі."
+        return "Перевірка номера в CRM недоступна зараз."
 
     matches = f"{total} збіг" if total == 1 else f"{total} збігів"
+    # Все строки ответа пишем в один список и склеиваем один раз в конце.
     lines = [f"Знайдено {matches}:"]
+    append = lines.append
 
     for idx, buyer in enumerate(buyers[:5], start=1):  # обмежуємо перші 5
         name = buyer.get("full_name") or buyer.get("name") or "Без імені"
@@ -316,48 +599,45 @@ def _format_crm_message(buyers: list[dict], total: int) -> str:
         manager_name = (
             manager.get("name") or manager.get("full_name") or "не призначений"
         )
+        append(f"{idx}. Клієнт: {name}")
+        append(f"   Менеджер: {manager_name}")
 
-        block: list[str] = [
-            f"{idx}. Клієнт: {name}",
-            f"   Менеджер: {manager_name}",
-        ]
-
-        emails = _join(buyer.get("email"))
+        emails = _join_values(buyer.get("email"))
         if emails:
-            block.append(f"   E-mail: {emails}")
+            append(f"   E-mail: {emails}")
 
-        phones = _join(buyer.get("phone"))
+        phones = _join_values(buyer.get("phone"))
         if phones:
-            block.append(f"   Телефон(и): {phones}")
+            append(f"   Телефон(и): {phones}")
 
         birthday = buyer.get("birthday")
         if birthday:
-            block.append(f"   Дата народження: {birthday}")
+            append(f"   Дата народження: {birthday}")
 
-        company = buyer.get("company") or {}
-        company_name = company.get("name")
+        company_name = (buyer.get("company") or {}).get("name")
         if company_name:
-            block.append(f"   Компанія: {company_name}")
-
-        for addr in _format_shipping(buyer.get("shipping")):
-            block.append(f"   {addr}")
-
-        cf_lines = _format_custom_fields(buyer.get("custom_fields"))
-        if cf_lines:
-            block.append("   Кастомні поля:")
-            block.extend([f"   - {line}" for line in cf_lines])
+            append(f"   Компанія: {company_name}")
 
-        lines.extend(block)
+        _append_shipping(lines, buyer.get("shipping"))
+        _append_custom_fields(lines, buyer.get("custom_fields"))
 
     if total > len(buyers):
-        lines.append("Показані перші записи.")
+        append("Показані перші записи.")
 
     return "\n".join(lines)
 
 
 def _normalize_phone(raw: str) -> str | None:
     """Return phone in format +380XXXXXXXXX or None if cannot normalize."""
-    digits = re.sub(r"\D", "", raw or "")
+    raw = raw or ""
+    if raw.isdecimal():
+        digits = raw
+    elif raw.isascii():
+        # Для ASCII (типичный номер) str.translate быстрее regex; прочий текст,
+        # например кириллицу, отдаём regex, он не медленнее построчного перевода.
+        digits = raw.translate(_ASCII_NON_DIGITS)
+    else:
+        digits = _NON_DIGIT.sub("", raw)
     if len(digits) == 12 and digits.startswith("380"):
         return f"+{digits}"
     if len(digits) == 10 and digits.startswith("0"):
@@ -371,11 +651,16 @@ def _normalize_phone(raw: str) -> str | None:
 
 def _normalize_email(raw: str) -> str | None:
     candidate = (raw or "").strip()
-    if re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", candidate):
+    if _EMAIL_RE.match(candidate):
         return candidate.lower()
     return None
 
 
+# Дополнительные варианты номера; первый ищется в потоке обработчика, так что
+# на каждый обработчик приходится не больше одного фонового запроса.
+_CRM_EXECUTOR = ThreadPoolExecutor(max_workers=HANDLER_WORKERS, thread_name_prefix="keycrm")
+
+
 def _lookup_phone_with_fallbacks(phone: str) -> tuple[list[dict], int]:
     """Try to find buyers by phone with and without leading plus."""
     variants: list[str] = []
@@ -387,86 +672,197 @@ def _lookup_phone_with_fallbacks(phone: str) -> tuple[list[dict], int]:
         if not phone.startswith("+") and phone.startswith("380"):
             variants.append(f"+{phone}")
 
-    for variant in variants:
-        buyers, total = _lookup_buyers("buyer_phone", variant)
+    if len(variants) <= 1:
+        return _lookup_buyers("buyer_phone", phone) if variants else ([], 0)
+
+    # Варианты независимы, поэтому запрашиваем их параллельно: промах стоит
+    # один RTT вместо нескольких подряд. Первый вариант ищем сами, остальные в пуле;
+    # результаты читаем в порядке вариантов, чтобы побеждал первый, как при
+    # последовательном поиске.
+    futures = [_CRM_EXECUTOR.submit(_lookup_buyers, "buyer_phone", v) for v in variants[1:]]
+    buyers, total = _lookup_buyers("buyer_phone", variants[0])
+    if total:
+        for future in futures:
+            future.cancel()
+        return buyers, total
+    for future in futures:
+        buyers, total = future.result()
         if total:
             return buyers, total
     return [], 0
 
 
+def _reply_to_phone(token: str, chat_id: int, phone: str) -> None:
+    response_text = f"Дякуємо! Ми отримали ваш номер: {phone}."
+    if not ENABLE_CRM:
+        send_message(token, chat_id, response_text)
+        return
+
+    buyers, total = _lookup_phone_with_fallbacks(phone)
+    response_text = f"{response_text}\n{_format_crm_message(buyers, total)}"
+    send_message(token, chat_id, response_text)
+
+
+def _reply_to_email(token: str, chat_id: int, email: str) -> None:
+    response_text = f"Дякуємо! Ми отримали ваш e-mail: {email}."
+    if ENABLE_CRM:
+        buyers, total = _lookup_buyers("buyer_email", email)
+        response_text = f"{response_text}\n{_format_crm_message(buyers, total)}"
+    send_message(token, chat_id, response_text)
+
+
+def handle_update(token: str, update: dict, allowed_ids: frozenset[int]) -> None:
+    message = update.get("message") or {}
+    message_get = message.get
+    text = message_get("text") or ""
+    chat_id = message_get("chat", {}).get("id")
+
+    logger.info("Update chat_id=%s text=%s", chat_id, text)
+
+    if not chat_id:
+        return
+    if allowed_ids and chat_id not in allowed_ids:
+        send_message(token, chat_id, "Доступ обмежено для цього бота.")
+        return
+    if text.startswith("/start"):
+        send_welcome(token, chat_id)
+        return
+    if not text:
+        return
+
+    normalized = _normalize_phone(text)
+    if normalized:
+        _reply_to_phone(token, chat_id, normalized)
+        return
+
+    if ENABLE_EMAIL_LOOKUP:
+        email = _normalize_email(text)
+        if email:
+            _reply_to_email(token, chat_id, email)
+            return
+
+    send_message(token, chat_id, INPUT_HINT_TEXT)
+
+
+def _update_worker(token: str, scheduler: _ChatScheduler, allowed_ids: frozenset[int]) -> None:
+    while True:
+        item = scheduler.get()
+        if item is None:
+            return
+        chat_id, update = item
+        try:
+            handle_update(token, update, allowed_ids)
+        except urllib.error.URLError as exc:
+            # Сетевые ошибки и отказы Telegram (например, 403 от заблокировавшего бота
+            # пользователя) ожидаемы: пишем без traceback.
+            logger.warning("Failed to handle update %s: %s", update.get("update_id"), exc)
+        except Exception as exc:  # pragma: no cover - handler errors must not kill the worker
+            logger.exception("Failed to handle update %s: %s", update.get("update_id"), exc)
+        finally:
+            scheduler.done(chat_id)
+
+
+def _start_workers(
+    token: str, allowed_ids: frozenset[int]
+) -> tuple[_ChatScheduler, list[threading.Thread]]:
+    """Start handler threads that take updates from a shared chat scheduler."""
+    scheduler = _ChatScheduler(UPDATE_QUEUE_SIZE)
+    threads = []
+    for idx in range(HANDLER_WORKERS):
+        thread = threading.Thread(
+            target=_update_worker,
+            args=(token, scheduler, allowed_ids),
+            name=f"handler-{idx}",
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    return scheduler, threads
+
+
+def _shutdown(scheduler: _ChatScheduler, workers: list[threading.Thread]) -> None:
+    """Let workers finish already confirmed updates.
+
+    Telegram treats polled updates as delivered, so they are handled before exit;
+    the wait is bounded by SHUTDOWN_TIMEOUT and whatever is left is reported.
+    """
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    scheduler.close()
+    for thread in workers:
+        thread.join(max(deadline - time.monotonic(), 0))
+    dropped = scheduler.unfinished()
+    if dropped:
+        logger.warning("Shutdown timeout: %d received updates were not handled", dropped)
+
+
+def _error_delay(error_streak: int) -> int:
+    """Pause before retrying getUpdates: 1, 2, 4, 8, ... seconds, capped at ERROR_MAX_DELAY."""
+    return min(ERROR_MAX_DELAY, 2 ** min(error_streak, 5))
+
+
 def main() -> None:
     token = _get_token()
     offset = 0
     allowed_ids = _allowed_chat_ids()
+    # getUpdates крутится в главном потоке и только передаёт апдейты планировщику;
+    # offset сдвигается сразу после пачки, не дожидаясь обработчиков.
+    scheduler, workers = _start_workers(token, allowed_ids)
+    # systemctl stop/restart шлёт SIGTERM: обрабатываем его как Ctrl+C, чтобы дообработать
+    # уже подтверждённые апдейты.
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+    # Локальные ссылки для цикла опроса: LOAD_FAST вместо поиска в globals на каждом апдейте.
+    dispatch = scheduler.put
+    poll = get_updates
+    monotonic = time.monotonic
 
     # Якщо бот був підключений як вебхук у CRM, видаляємо його, щоб уникнути 409 Conflict.
     clear_webhook(token)
 
     logger.info("Bot is running. Press Ctrl+C to stop.")
 
-    while True:
-        try:
-            updates = get_updates(token, offset)
-            for update in updates:
-                offset = update.get("update_id", offset) + 1
-                message = update.get("message") or {}
-                text = message.get("text") or ""
-                chat_id = message.get("chat", {}).get("id")
-
-                logger.info("Update chat_id=%s text=%s", chat_id, text)
-
-                if allowed_ids and chat_id and chat_id not in allowed_ids:
-                    _call_api(
-                        token,
-                        "sendMessage",
-                        {"chat_id": chat_id, "text": "Доступ обмежено для цього бота."},
-                    )
-                    continue
-
-                if text.startswith("/start") and chat_id:
-                    send_welcome(token, chat_id)
-                elif chat_id and text:
-                    normalized = _normalize_phone(text)
-                    if normalized:
-                        buyers, total = _lookup_phone_with_fallbacks(normalized)
-                        response_text = (
-                            f"Дякуємо! Ми отримали ваш номер: {normalized}.\n"
-                            f"{_format_crm_message(buyers, total)}"
-                        )
-                        _call_api(token, "sendMessage", {"chat_id": chat_id, "text": response_text})
-                        continue
-
-                    email = _normalize_email(text)
-                    if email:
-                        buyers, total = _lookup_buyers("buyer_email", email)
-                        response_text = (
-                            f"Дякуємо! Ми отримали ваш e-mail: {email}.\n"
-                            f"{_format_crm_message(buyers, total)}"
-                        )
-                        _call_api(token, "sendMessage", {"chat_id": chat_id, "text": response_text})
-                        continue
-
-                    else:
-                        _call_api(
-                            token,
-                            "sendMessage",
-                            {
-                                "chat_id": chat_id,
-                                "text": "Будь ласка, введіть номер у форматі +380XXXXXXXXX, e-mail або поділіться контактом кнопкою.",
-                            },
-                        )
-        except KeyboardInterrupt:
-            print("\nBot stopped by user.")
-            break
-        except urllib.error.URLError as exc:
-            logger.warning("Network error: %s. Retrying in 3 seconds...", exc)
-            time.sleep(3)
-        except urllib.error.HTTPError as exc:
-            logger.warning("HTTP error: %s. Retrying in 3 seconds...", exc)
-            time.sleep(3)
-        except Exception as exc:  # pragma: no cover - safety net for unexpected errors
-            logger.exception("Unexpected error: %s. Retrying in 3 seconds...", exc)
-            time.sleep(3)
+    empty_streak = 0
+    error_streak = 0
+    try:
+        while True:
+            try:
+                polled_at = monotonic()
+                updates = poll(token, offset)
+                error_streak = 0
+                if updates:
+                    empty_streak = 0
+                elif monotonic() - polled_at < TELEGRAM_POLL_TIMEOUT / 2:
+                    # Пустой ответ пришёл раньше таймаута long polling (его не держит прокси/сеть):
+                    # постепенно наращиваем паузу, чтобы не слать запросы впустую.
+                    empty_streak += 1
+                    time.sleep(min(EMPTY_POLL_MAX_DELAY, empty_streak * EMPTY_POLL_DELAY_STEP))
+                else:
+                    empty_streak = 0
+                for update in updates:
+                    chat_id = (update.get("message") or {}).get("chat", {}).get("id") or 0
+                    dispatch(chat_id, update)
+                    # offset сдвигаем после передачи апдейта планировщику. Повторной доставки
+                    # при перезапуске нет: clear_webhook() при старте вызывает deleteWebhook
+                    # с drop_pending_updates=True и отбрасывает все неподтверждённые апдейты.
+                    offset = update.get("update_id", offset) + 1
+            except urllib.error.HTTPError as exc:
+                delay = _error_delay(error_streak)
+                error_streak += 1
+                logger.warning("HTTP error: %s. Retrying in %d seconds...", exc, delay)
+                time.sleep(delay)
+            except urllib.error.URLError as exc:
+                delay = _error_delay(error_streak)
+                error_streak += 1
+                logger.warning("Network error: %s. Retrying in %d seconds...", exc, delay)
+                time.sleep(delay)
+            except Exception as exc:  # pragma: no cover - safety net for unexpected errors
+                delay = _error_delay(error_streak)
+                error_streak += 1
+                logger.exception("Unexpected error: %s. Retrying in %d seconds...", exc, delay)
+                time.sleep(delay)
+    except KeyboardInterrupt:
+        logger.info("Bot stopped, finishing received updates...")
+    _shutdown(scheduler, workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,274 @@
+import http.client
+import re
+import threading
+import time
+import unittest
+import urllib.error
+from unittest import mock
+
+import bot
+
+
+class ChatSchedulerTest(unittest.TestCase):
+    def _run_workers(self, scheduler: bot._ChatScheduler, count: int) -> list[threading.Thread]:
+        threads = []
+        for _ in range(count):
+            thread = threading.Thread(
+                target=bot._update_worker,
+                args=("token", scheduler, frozenset()),
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def test_busy_chat_does_not_delay_other_chat(self):
+        scheduler = bot._ChatScheduler(capacity=100)
+        for update_id in range(5):
+            scheduler.put(1, {"update_id": update_id})
+        scheduler.put(2, {"update_id": 100})
+
+        handled: list[int] = []
+        other_chat_done = threading.Event()
+
+        def handle(token, update, allowed_ids):
+            if update["update_id"] == 100:
+                handled.append(100)
+                other_chat_done.set()
+                return
+            time.sleep(0.2)
+            handled.append(update["update_id"])
+
+        with mock.patch.object(bot, "handle_update", handle):
+            threads = self._run_workers(scheduler, 2)
+            self.assertTrue(other_chat_done.wait(1))
+            # Чат 2 обслужен, пока у чата 1 ещё почти вся очередь впереди.
+            self.assertLessEqual(len([u for u in handled if u != 100]), 1)
+            scheduler.close()
+            for thread in threads:
+                thread.join(2)
+
+    def test_chat_updates_are_handled_in_order_and_one_at_a_time(self):
+        scheduler = bot._ChatScheduler(capacity=100)
+        for update_id in range(10):
+            scheduler.put(1, {"update_id": update_id})
+
+        handled: list[int] = []
+        active = []
+        overlaps = []
+        all_done = threading.Event()
+
+        def handle(token, update, allowed_ids):
+            active.append(update["update_id"])
+            if len(active) > 1:
+                overlaps.append(update["update_id"])
+            time.sleep(0.01)
+            active.remove(update["update_id"])
+            handled.append(update["update_id"])
+            if len(handled) == 10:
+                all_done.set()
+
+        with mock.patch.object(bot, "handle_update", handle):
+            threads = self._run_workers(scheduler, 4)
+            self.assertTrue(all_done.wait(2))
+            scheduler.close()
+            for thread in threads:
+                thread.join(2)
+
+        self.assertEqual(handled, list(range(10)))
+        self.assertEqual(overlaps, [])
+
+    def test_close_drains_queued_updates_before_workers_exit(self):
+        scheduler = bot._ChatScheduler(capacity=100)
+        for update_id in range(6):
+            scheduler.put(update_id % 2, {"update_id": update_id})
+
+        handled: list[int] = []
+
+        def handle(token, update, allowed_ids):
+            time.sleep(0.01)
+            handled.append(update["update_id"])
+
+        with mock.patch.object(bot, "handle_update", handle):
+            threads = self._run_workers(scheduler, 2)
+            scheduler.close()
+            for thread in threads:
+                thread.join(2)
+
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.assertEqual(sorted(handled), list(range(6)))
+        self.assertEqual(scheduler.unfinished(), 0)
+
+
+def _normalize_phone_regex(raw):
+    """Reference: the original regex-based _normalize_phone."""
+    digits = re.sub(r"\D", "", raw or "")
+    if len(digits) == 12 and digits.startswith("380"):
+        return f"+{digits}"
+    if len(digits) == 10 and digits.startswith("0"):
+        return f"+380{digits[1:]}"
+    if len(digits) == 9:
+        return f"+380{digits}"
+    if len(digits) == 11 and digits.startswith("80"):
+        return f"+3{digits}"
+    return None
+
+
+class NormalizePhoneTest(unittest.TestCase):
+    def test_matches_regex_version(self):
+        samples = [
+            None,
+            "",
+            "0991234567",
+            "+38 (099) 123-45-67",
+            "380991234567",
+            "80991234567",
+            "991234567",
+            "hello",
+            "a@b.cc",
+            "Мій номер: +38 (099) 123-45-67",
+            "Доброго дня! Коли буде відправлене замовлення №12345?",
+            "٠٩٩١٢٣٤٥٦٧",  # арабско-индийские цифры
+            "０９９１２３４５６７",  # полноширинные цифры
+            "+٣٨٠٩٩١٢٣٤٥٦٧",
+            "²³",  # isdigit, но не isdecimal
+            "0991234567\u00a0",
+        ]
+        for raw in samples:
+            with self.subTest(raw=raw):
+                self.assertEqual(bot._normalize_phone(raw), _normalize_phone_regex(raw))
+
+
+class FormatCrmMessageTest(unittest.TestCase):
+    def test_full_buyer(self):
+        buyer = {
+            "full_name": "Іван Петренко",
+            "manager": {"full_name": "Олена"},
+            "email": ["ivan@example.com", None, ""],
+            "phone": ["+380991234567", "+380671234567"],
+            "birthday": "1990-01-02",
+            "company": {"name": "ТОВ Ромашка"},
+            "shipping": [
+                {"address": "вул. Хрещатик, 1", "city": "Київ", "zip_code": "01001"},
+                {},
+                {"city": "Львів"},
+                {"city": "Одеса"},
+            ],
+            "custom_fields": [
+                {"uuid": "CT_1", "value": ["a", 2]},
+                {"uuid": "CT_2", "value": ""},
+                {"value": "без uuid"},
+            ],
+        }
+        expected = "\n".join(
+            [
+                "Знайдено 1 збіг:",
+                "1. Клієнт: Іван Петренко",
+                "   Менеджер: Олена",
+                "   E-mail: ivan@example.com",
+                "   Телефон(и): +380991234567, +380671234567",
+                "   Дата народження: 1990-01-02",
+                "   Компанія: ТОВ Ромашка",
+                "   Адреса: вул. Хрещатик, 1, Київ, 01001",
+                "   Адреса: Львів",
+                "   Кастомні поля:",
+                "   - CT_1: a, 2",
+                "   - поле: без uuid",
+            ]
+        )
+        self.assertEqual(bot._format_crm_message([buyer], 1), expected)
+
+    def test_minimal_buyers_are_limited_to_five(self):
+        buyers = [{"name": f"n{i}"} for i in range(7)] + [{}]
+        lines = bot._format_crm_message(buyers, 12).split("\n")
+        self.assertEqual(lines[0], "Знайдено 12 збігів:")
+        self.assertEqual(lines[1:3], ["1. Клієнт: n0", "   Менеджер: не призначений"])
+        self.assertEqual(lines[9], "5. Клієнт: n4")
+        self.assertEqual(lines[-1], "Показані перші записи.")
+        self.assertEqual(len(lines), 1 + 5 * 2 + 1)
+
+    def test_custom_fields_are_limited_to_five(self):
+        buyer = {"full_name": "X", "custom_fields": [{"uuid": f"u{i}", "value": i + 1} for i in range(8)]}
+        lines = bot._format_crm_message([buyer], 1).split("\n")
+        self.assertEqual(lines[3], "   Кастомні поля:")
+        self.assertEqual(lines[4:], [f"   - u{i}: {i + 1}" for i in range(5)])
+
+    def test_no_buyers(self):
+        with mock.patch.object(bot, "_get_keycrm_token", return_value="token"):
+            self.assertEqual(bot._format_crm_message([], 0), "Номер не знайдено в системі.")
+        with mock.patch.object(bot, "_get_keycrm_token", return_value=None):
+            self.assertEqual(
+                bot._format_crm_message([], 0), "Перевірка номера в CRM недоступна зараз."
+            )
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_burst_then_rate(self):
+        clock = [100.0]
+        sleeps: list[float] = []
+        with mock.patch.object(bot.time, "monotonic", lambda: clock[0]), mock.patch.object(
+            bot.time, "sleep", sleeps.append
+        ):
+            limiter = bot._RateLimiter(rate=10, burst=3)
+            for _ in range(5):
+                limiter.acquire()
+            self.assertEqual(len(sleeps), 2)
+            self.assertAlmostEqual(sleeps[0], 0.1)
+            self.assertAlmostEqual(sleeps[1], 0.2)
+
+            # Через секунду бакет снова полон, но не больше burst.
+            clock[0] += 1.0
+            sleeps.clear()
+            for _ in range(3):
+                limiter.acquire()
+            self.assertEqual(sleeps, [])
+            limiter.acquire()
+            self.assertAlmostEqual(sleeps[0], 0.1)
+
+
+class ErrorDelayTest(unittest.TestCase):
+    def test_exponential_with_cap(self):
+        self.assertEqual(
+            [bot._error_delay(streak) for streak in range(8)], [1, 2, 4, 8, 16, 30, 30, 30]
+        )
+        self.assertEqual(bot._error_delay(1000), bot.ERROR_MAX_DELAY)
+
+
+class _DroppingConnection:
+    """Connection stub: the first request on each instance fails as if the server hung up."""
+
+    requests: list[str] = []
+
+    def __init__(self, host, timeout=None, context=None):
+        self.sock = None
+
+    def request(self, method, path, body=None, headers=None):
+        _DroppingConnection.requests.append(method)
+
+    def getresponse(self):
+        raise http.client.RemoteDisconnected("Remote end closed connection without response")
+
+    def close(self):
+        pass
+
+
+class KeepAliveClientTest(unittest.TestCase):
+    def setUp(self):
+        _DroppingConnection.requests = []
+        self.client = bot._KeepAliveClient("example.org", 1.0, None, _DroppingConnection)
+        # Имитируем уже открытое keep-alive соединение.
+        self.client._local.conn = _DroppingConnection("example.org")
+
+    def test_post_is_not_replayed_after_disconnect(self):
+        with self.assertRaises(urllib.error.URLError):
+            self.client.request("POST", "/botT/sendMessage", b"chat_id=1&text=hi")
+        self.assertEqual(_DroppingConnection.requests, ["POST"])
+
+    def test_get_is_retried_once_on_fresh_connection(self):
+        with self.assertRaises(urllib.error.URLError):
+            self.client.request("GET", "/v1/buyer")
+        self.assertEqual(_DroppingConnection.requests, ["GET", "GET"])
+
+
+if __name__ == "__main__":
+    unittest.main()